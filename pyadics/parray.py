@@ -0,0 +1,108 @@
+from .pfloat import PAdicFloat, _addsig, _mulsig, _MIN_PADIC_EXPONENT
+
+
+class PAdicArray():
+    # p-adic numbers of a common prime stored as parallel lists of
+    # normalized exponents and significands, so pointwise arithmetic
+    # runs on plain ints instead of one PAdicFloat per element
+    __slots__ = ('prime', 'exponents', 'significands')
+
+    def __init__(self, values=(), prime=2):
+        self.prime = prime
+        self.exponents = []
+        self.significands = []
+        for x in values:
+            if not isinstance(x, PAdicFloat):
+                x = PAdicFloat(x, prime=prime)
+            elif x.prime != prime:
+                raise ValueError(f"Expected {prime}-adic values, "
+                                 f"got a {x.prime}-adic one.")
+            x = x.normalize()
+            self.exponents.append(x.exponent)
+            self.significands.append(x.significand)
+
+    @classmethod
+    def _fromlists(cls, exponents, significands, prime):
+        obj = cls(prime=prime)
+        obj.exponents = exponents
+        obj.significands = significands
+        return obj
+
+    def __len__(self):
+        return len(self.exponents)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PAdicArray._fromlists(self.exponents[i],
+                                         self.significands[i],
+                                         self.prime)
+        return PAdicFloat(exponent=self.exponents[i],
+                          significand=self.significands[i],
+                          prime=self.prime).normalize()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        items = ', '.join(repr(x) for x in self)
+        return f"PAdicArray([{items}])"
+
+    def __str__(self):
+        return '[' + ', '.join(str(x) for x in self) + ']'
+
+    def _pointwise(self, other, kernel, op):
+        n = len(self)
+        if isinstance(other, PAdicArray):
+            if self.prime != other.prime:
+                return NotImplemented
+            if len(other) != n:
+                raise ValueError(f"Length mismatch: {n} and {len(other)}.")
+            bexps = other.exponents
+            bsigs = other.significands
+        else:
+            if not isinstance(other, PAdicFloat):
+                try:
+                    other = PAdicFloat(other, prime=self.prime)
+                except TypeError:
+                    return NotImplemented
+            if self.prime != other.prime:
+                return NotImplemented
+            other = other.normalize()
+            bexps = [other.exponent] * n
+            bsigs = [other.significand] * n
+        p = self.prime
+        exps = [0] * n
+        sigs = [0] * n
+        rows = zip(self.exponents, self.significands, bexps, bsigs)
+        for i, (aexp, asig, bexp, bsig) in enumerate(rows):
+            if aexp < _MIN_PADIC_EXPONENT or bexp < _MIN_PADIC_EXPONENT:
+                # NaN or inf, let PAdicFloat sort it out
+                z = op(PAdicFloat(exponent=aexp, significand=asig, prime=p),
+                       PAdicFloat(exponent=bexp, significand=bsig, prime=p))
+                z = z.normalize()
+                exps[i], sigs[i] = z.exponent, z.significand
+            else:
+                exps[i], sigs[i] = kernel(p, aexp, asig, bexp, bsig)
+        return PAdicArray._fromlists(exps, sigs, p)
+
+    def __mul__(self, other):
+        return self._pointwise(other, _mulsig, PAdicFloat.__mul__)
+
+    def __rmul__(self, other):
+        return self*other
+
+    def __add__(self, other):
+        return self._pointwise(other, _addsig, PAdicFloat.__add__)
+
+    def __radd__(self, other):
+        return self+other
+
+    def __neg__(self):
+        return self*-1
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return -(self - other)
@@ -1,4 +1,11 @@
 from fractions import Fraction
+from functools import lru_cache
+from itertools import accumulate
+
+try:  # optional, GMP-backed modular inverses
+    import gmpy2
+except ImportError:
+    gmpy2 = None
 
 _PADIC_PRECISION = 65  # we're storing 65 p-adic digits
 _MAX_PADIC_EXPONENT = 64  # max valuation is 64, min is -63
@@ -7,22 +14,115 @@ _DISPLAY_CAP = 10  # when printed, show first 10 digits
 _USE_UNICODE = True  # should we print ∞ as unicode on screen?
 
 _PRECISION_RANGE = range(0, _PADIC_PRECISION)
+_MASK2 = (1 << _PADIC_PRECISION) - 1  # x % 2**_PADIC_PRECISION == x & _MASK2
 _DISPLAY_RANGE = range(0, _DISPLAY_CAP)
 
 
-def _invmod(a, p, power):  # is there a faster way to do this?
-    # Hensel's lemma
-    c = pow(a, -1, p)
-    b = c
-    for i in range(2, power+1):
-        b = (b - (a*b - 1)*c) % p**i
-    return b
+@lru_cache(maxsize=None)
+def _pmod(p):
+    # modulus of the significands, p**_PADIC_PRECISION
+    return p ** _PADIC_PRECISION
+
+
+@lru_cache(maxsize=None)
+def _ppow_small(p, k):
+    return p ** k
+
+
+def _ppow(p, k):
+    # only memoize the shifts arithmetic produces, exponents coming from
+    # user input (valuations of arbitrary ints) would grow the cache forever
+    if 0 <= k <= 2*_PADIC_PRECISION:
+        return _ppow_small(p, k)
+    return p ** k
+
+
+def _invmod(a, p, power):
+    # Hensel's lemma, Newton form: x <- x*(2 - a*x) doubles the
+    # number of correct p-adic digits at every step
+    if gmpy2 is not None:
+        a = gmpy2.mpz(a)
+        x = gmpy2.invert(a, p)
+    else:
+        x = pow(a, -1, p)
+    cur = 1
+    while cur < power:
+        cur = min(2*cur, power)
+        x = (x * (2 - a*x)) % _ppow(p, cur)
+    return int(x)
+
+
+@lru_cache(maxsize=4096)
+def _invmod_cached(a, p, power):
+    # the same denominators come back over and over in divisions and
+    # conversions from Fraction
+    return _invmod(a, p, power)
+
+
+def _batchinvmod(values, p):
+    # Montgomery's trick: the inverses mod p**_PADIC_PRECISION of all the
+    # units in values, and of their running products, from one _invmod
+    pmod = _pmod(p)
+    n = len(values)
+    invs = [0] * n
+    prefixinvs = [0] * n
+    if n == 0:
+        return invs, prefixinvs
+    prefix = list(accumulate(values, lambda x, y: (x * y) % pmod))
+    inv = _invmod(prefix[-1], p, _PADIC_PRECISION)
+    for k in range(n - 1, 0, -1):
+        prefixinvs[k] = inv
+        invs[k] = (inv * prefix[k - 1]) % pmod
+        inv = (inv * values[k]) % pmod
+    invs[0] = prefixinvs[0] = inv
+    return invs, prefixinvs
+
+
+def _addsig(p, aexp, asig, bexp, bsig):
+    # sum of two normalized (exponent, significand) pairs, normalized
+    if aexp > bexp:
+        aexp, asig, bexp, bsig = bexp, bsig, aexp, asig
+    if aexp == bexp:
+        # cancellation may happen
+        total = asig + bsig
+        v = PAdicFloat._valuationFromInt(total, p)
+        if total == 0 or v > _MAX_PADIC_EXPONENT - aexp:  # overflow
+            return _MAX_PADIC_EXPONENT, 0
+        if p == 2:
+            return aexp + v, (total >> v) & _MASK2
+        return aexp + v, (total // _ppow(p, v)) % _pmod(p)
+    # non-archimedianess kicks in!
+    if p == 2:
+        return aexp, ((bsig << (bexp - aexp)) + asig) & _MASK2
+    return aexp, (bsig * _ppow(p, bexp - aexp) + asig) % _pmod(p)
+
+
+def _mulsig(p, aexp, asig, bexp, bsig):
+    # product of two normalized (exponent, significand) pairs, normalized
+    newexp = aexp + bexp
+    if newexp > _MAX_PADIC_EXPONENT or asig == 0 or bsig == 0:  # underflow
+        return _MAX_PADIC_EXPONENT, 0
+    if newexp < _MIN_PADIC_EXPONENT:  # overflow
+        return _MIN_PADIC_EXPONENT - 1, 1
+    if p == 2:
+        return newexp, (asig * bsig) & _MASK2
+    return newexp, (asig * bsig) % _pmod(p)
+
+
+@lru_cache(maxsize=None)
+def _constant(exponent, significand, prime):
+    # special values are shared per prime rather than rebuilt on every use
+    obj = PAdicFloat(exponent=exponent, significand=significand, prime=prime)
+    obj._norm = True
+    return obj
 
 
 class PAdicFloat():
+    __slots__ = ('prime', 'significand', 'exponent', '_norm')
 
     def __new__(cls, fromrational=None, **kwargs):
         obj = super().__new__(cls)
+        obj._norm = False
         if 'prime' in kwargs:
             obj.prime = kwargs['prime']
         else:
@@ -39,8 +139,12 @@ class PAdicFloat():
         elif fromrational is not None:
             if isinstance(fromrational, int):
                 obj.exponent = cls._valuationFromInt(fromrational, obj.prime)
-                obj.significand = (fromrational // (obj.prime**obj.exponent)) \
-                    % (obj.prime ** _PADIC_PRECISION)
+                if obj.prime == 2:
+                    obj.significand = (fromrational >> obj.exponent) & _MASK2
+                    return obj
+                obj.significand = (fromrational
+                                   // (obj.prime ** obj.exponent)) \
+                    % _pmod(obj.prime)
                 return obj
             if isinstance(fromrational, Fraction):
                 num = fromrational.numerator
@@ -56,9 +160,10 @@ class PAdicFloat():
                     obj.exponent = numval
                     unitfactor = num // (obj.prime ** numval)
                     unitdem = dem
-                deminverse = _invmod(unitdem, obj.prime, _PADIC_PRECISION)
+                deminverse = _invmod_cached(unitdem, obj.prime,
+                                            _PADIC_PRECISION)
                 obj.significand = (unitfactor*deminverse) \
-                    % (obj.prime ** _PADIC_PRECISION)
+                    % _pmod(obj.prime)
                 return obj
             else:
                 t = type(fromrational)
@@ -70,27 +175,34 @@ class PAdicFloat():
 
     @classmethod
     def NaN(cls, prime=2):
-        return PAdicFloat(exponent=_MIN_PADIC_EXPONENT-1,
-                          significand=0,
-                          prime=prime)
+        return _constant(_MIN_PADIC_EXPONENT-1, 0, prime)
 
     @classmethod
     def inf(cls, prime=2):
-        return PAdicFloat(exponent=_MIN_PADIC_EXPONENT-1,
-                          significand=1,
-                          prime=prime)
+        return _constant(_MIN_PADIC_EXPONENT-1, 1, prime)
+
+    @classmethod
+    def zero(cls, prime=2):
+        return _constant(_MAX_PADIC_EXPONENT, 0, prime)
 
     @classmethod
     def _valuationFromInt(cls, i, p):
-        val = 0
         if i == 0:
             return _MAX_PADIC_EXPONENT
-        while i % p == 0:
-            i = i // p
+        if p == 2:  # count trailing zero bits
+            return (i & -i).bit_length() - 1
+        val = 0
+        while True:
+            q, r = divmod(i, p)
+            if r:
+                return val
+            i = q
             val += 1
-        return val
 
     def _significantDisplay(self):
+        if self.prime == 2:
+            n = self.significand
+            return tuple((n >> j) & 1 for j in _DISPLAY_RANGE)
         coeffs = [0] * _DISPLAY_CAP
         n = self.significand
         for j in _DISPLAY_RANGE:
@@ -132,6 +244,8 @@ class PAdicFloat():
         print(f"z is NaN? {self.isNaN()}")
 
     def normalize(self):
+        if self._norm:
+            return self
         if self.exponent < _MIN_PADIC_EXPONENT and self.significand == 0:
             exponent = _MIN_PADIC_EXPONENT - 1
             significand = 0  # NaN
@@ -147,12 +261,21 @@ class PAdicFloat():
         else:
             exponent = self.__class__._valuationFromInt(self.significand,
                                                         self.prime)
-            significand = (self.significand // (self.prime ** exponent)) \
-                % (self.prime ** _PADIC_PRECISION)
+            if self.prime == 2:
+                significand = (self.significand >> exponent) & _MASK2
+            else:
+                significand = (self.significand
+                               // _ppow(self.prime, exponent)) \
+                    % _pmod(self.prime)
             exponent += self.exponent
-        return PAdicFloat(exponent=exponent,
-                          significand=significand,
-                          prime=self.prime)
+        if exponent == self.exponent and significand == self.significand:
+            self._norm = True
+            return self
+        obj = PAdicFloat(exponent=exponent,
+                         significand=significand,
+                         prime=self.prime)
+        obj._norm = True
+        return obj
 
     def __eq__(self, other):
         if not isinstance(other, PAdicFloat):
@@ -160,11 +283,19 @@ class PAdicFloat():
                 other = PAdicFloat(other, prime=self.prime)
             except TypeError:
                 return NotImplemented
+        elif self.prime != other.prime:
+            return False
         a = self.normalize()
         b = other.normalize()
         if a.isNaN() or b.isNaN():
             return False
-        return (a-b).iszero()
+        if a is b:
+            return True
+        if a.exponent != b.exponent:
+            return False
+        # digits beyond p**_MAX_PADIC_EXPONENT are below precision
+        prec = _PADIC_PRECISION - max(0, a.exponent)
+        return (a.significand - b.significand) % _ppow(a.prime, prec) == 0
 
     def __bool__(self):
         return not self.iszero()
@@ -185,16 +316,13 @@ class PAdicFloat():
             if a.iszero() or b.iszero():
                 return PAdicFloat.NaN(prime=self.prime)
             return PAdicFloat.inf(prime=self.prime)
-        newexp = a.exponent + b.exponent
-        if newexp > _MAX_PADIC_EXPONENT:  # underflow
-            newsigs = 0
-            newexp = _MAX_PADIC_EXPONENT
-        else:
-            newsigs = (a.significand*b.significand) \
-                % (self.prime ** _PADIC_PRECISION)
-        return PAdicFloat(exponent=newexp,
-                          significand=newsigs,
-                          prime=self.prime)
+        newexp, newsigs = _mulsig(self.prime, a.exponent, a.significand,
+                                  b.exponent, b.significand)
+        c = PAdicFloat(exponent=newexp,
+                       significand=newsigs,
+                       prime=self.prime)
+        c._norm = True
+        return c
 
     def __rmul__(self, other):
         return self*other
@@ -218,14 +346,14 @@ class PAdicFloat():
         if b.isinf():
             if a.isinf():
                 return PAdicFloat.NaN(prime=self.prime)
-            return PAdicFloat(0, prime=self.prime)
+            return PAdicFloat.zero(prime=self.prime)
         newexp = a.exponent - b.exponent
         if newexp < _MIN_PADIC_EXPONENT:  # overflow
             newsigs = 1
             newexp = _MIN_PADIC_EXPONENT - 1
         else:
-            c = _invmod(b.significand, self.prime, _PADIC_PRECISION)
-            newsigs = (a.significand * c) % (self.prime ** _PADIC_PRECISION)
+            c = _invmod_cached(b.significand, self.prime, _PADIC_PRECISION)
+            newsigs = (a.significand * c) % _pmod(self.prime)
         return PAdicFloat(exponent=newexp,
                           significand=newsigs,
                           prime=self.prime)
@@ -247,31 +375,13 @@ class PAdicFloat():
             return PAdicFloat.NaN(prime=self.prime)
         if a.isinf() or b.isinf():
             return PAdicFloat.inf(prime=self.prime)
-        if (a.exponent == b.exponent):
-            # cancellation may happen
-            v = self.__class__._valuationFromInt(a.significand + b.significand,
-                                                 self.prime)
-            if v > _MAX_PADIC_EXPONENT - a.exponent:  # overflow
-                newexp = _MAX_PADIC_EXPONENT
-                newsigs = 0
-            else:
-                newexp = a.exponent + v
-                newsigs = (a.significand + b.significand) // (self.prime ** v)
-        elif a.exponent > b.exponent:
-            # non-archimedianess kicks in!
-            newexp = b.exponent
-            newsigs = (a.significand
-                       * (self.prime**(a.exponent - b.exponent))) \
-                + b.significand
-        else:
-            # non-archimedianess kicks in!
-            newexp = a.exponent
-            newsigs = (b.significand
-                       * (self.prime**(b.exponent - a.exponent))) \
-                + a.significand
-        return PAdicFloat(significand=newsigs,
-                          exponent=newexp,
-                          prime=self.prime)
+        newexp, newsigs = _addsig(self.prime, a.exponent, a.significand,
+                                  b.exponent, b.significand)
+        c = PAdicFloat(significand=newsigs,
+                       exponent=newexp,
+                       prime=self.prime)
+        c._norm = True
+        return c
 
     def __radd__(self, other):
         return self+other
@@ -292,53 +402,77 @@ class PAdicFloat():
 def plog(padicNumber):
     t = (padicNumber - 1).normalize()
     texp = t.exponent
-    tclean = t / (t.prime ** texp)
     if texp < 1:
         raise ValueError("p-adic logarithm only defined for 1 + pZp.")
-    log = PAdicFloat(0, prime=t.prime)
-    summand = t
-    powersig = tclean
+    # the series is summed directly on (exponent, significand) pairs,
+    # all significands being units taken mod p**_PADIC_PRECISION
+    p = t.prime
+    pmod = _pmod(p)
+    tsig = t.significand
+    logexp, logsig = _MAX_PADIC_EXPONENT, 0
+    sumexp, sumsig = texp, tsig
+    powersig = tsig
     powerexp = texp
+    sign = 1
     target = (_MAX_PADIC_EXPONENT // texp) + 1
+    iexps = [PAdicFloat._valuationFromInt(i, p) for i in range(target+1)]
+    ifactors = [i // _ppow(p, iexps[i]) for i in range(2, target+1)]
+    ifactor_invs, _ = _batchinvmod(ifactors, p)
     for i in range(2, target+1):
-        log = (log + summand).normalize()
-        powersig *= tclean
+        logexp, logsig = _addsig(p, logexp, logsig, sumexp, sumsig)
+        sign = -sign
+        powersig = (powersig * tsig) % pmod
         powerexp += texp
-        iexp = PAdicFloat._valuationFromInt(i, t.prime)
-        ifactor = i // (t.prime ** iexp)
-        factor = PAdicFloat(Fraction(pow(-1, i-1), ifactor), prime=t.prime)
-        scaling = PAdicFloat(t.prime ** (powerexp - iexp), prime=t.prime)
-        summand = ((powersig * factor) * scaling).normalize()
-    return log
+        sumexp = powerexp - iexps[i]
+        if sumexp > _MAX_PADIC_EXPONENT:
+            # needs i*val_p(t) > _MAX_PADIC_EXPONENT, i.e. i == target: the
+            # last summand is never added, so skip computing it
+            break
+        sumsig = (sign * powersig * ifactor_invs[i-2]) % pmod
+    return PAdicFloat(exponent=logexp, significand=logsig, prime=p)
 
 
 def pexp(padicNumber):
     t = padicNumber.normalize()
     texp = t.exponent
-    tclean = t / (t.prime**texp)
     if t.prime == 2 and texp < 2:
         raise ValueError("p-adic exponential only defined for 4Z_2")
     if t.prime != 2 and texp < 1:
         raise ValueError("p-adic exponential only defined for pZp")
-    exp = PAdicFloat(0, prime=t.prime)
-    summand = PAdicFloat(1, prime=t.prime)
-    powersig = PAdicFloat(1, prime=t.prime)
+    p = t.prime
+    pmod = _pmod(p)
+    tsig = t.significand
+    expexp, expsig = _MAX_PADIC_EXPONENT, 0
+    sumexp, sumsig = 0, 1
+    powersig = 1
     powerexp = 0
     # to determine bounts, we use that val_p(n!) ~ n/(p-1)
     # thus, n*val_p(t) - val_p(n!) ~ n*(val_p(t) - 1/(p-1))
     # assymptotically.
     # hence, we sum only up to n = (precision / (vap_p(t) - 1/(p-1))) + 1
     target = int(_MAX_PADIC_EXPONENT / (t.exponent - 1/(t.prime - 1))) + 1
+    # exactly, val_p(n!) <= (n-1)/(p-1), so from the first n with
+    # n*val_p(t) - (n-1)/(p-1) past the maximum on, every term vanishes
+    last = target
+    for n in range(1, target+1):
+        if n*texp - (n - 1) // (p - 1) > _MAX_PADIC_EXPONENT:
+            last = n - 1
+            break
+    # n! = p**factexp * u, we need the inverse of the unit u mod p**N
+    iexps = [PAdicFloat._valuationFromInt(i, p) for i in range(last+1)]
+    ifactors = [i // _ppow(p, iexps[i]) for i in range(1, last+1)]
+    _, factinvs = _batchinvmod(ifactors, p)
     factexp = 0
-    factsig = PAdicFloat(1, prime=t.prime)
     for i in range(1, target+1):
-        exp = (exp + summand).normalize()
+        expexp, expsig = _addsig(p, expexp, expsig, sumexp, sumsig)
+        if i > last:
+            break
         powerexp += texp
-        powersig *= tclean
-        iexp = PAdicFloat._valuationFromInt(i, t.prime)
-        factexp += iexp
-        factsig /= (i // (t.prime**iexp))
-        scaling = PAdicFloat(t.prime**(powerexp-factexp),
-                             prime=t.prime).normalize()
-        summand = (scaling * (powersig * factsig)).normalize()
-    return exp
+        powersig = (powersig * tsig) % pmod
+        factexp += iexps[i]
+        sumexp = powerexp - factexp
+        if sumexp > _MAX_PADIC_EXPONENT:  # underflow
+            sumexp, sumsig = _MAX_PADIC_EXPONENT, 0
+        else:
+            sumsig = (powersig * factinvs[i-1]) % pmod
+    return PAdicFloat(exponent=expexp, significand=expsig, prime=p)
@@ -9,4 +9,5 @@ setup(name='pyadics',
       author_email='henrique.ams.souza@gmail.com',
       license='GNU General Public License v3.0',
       packages=['pyadics'],
+      extras_require={'gmpy2': ['gmpy2']},
       zip_safe=False)